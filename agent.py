@@ -4,18 +4,188 @@ An intelligent agent that can use multiple tools to accomplish tasks
 """
 
 import os
-from typing import List, Dict, Any, Optional
+import sys
+import inspect
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Dict, Any, Iterator, Optional
 from langchain.agents import Tool, AgentExecutor, create_react_agent
 from langchain.prompts import PromptTemplate
 from langchain_community.llms import Ollama
 from langchain_community.utilities import WikipediaAPIWrapper, PythonREPL
 from langchain_community.tools import DuckDuckGoSearchRun
-from langchain.memory import ConversationBufferMemory
+from langchain.memory import ConversationBufferWindowMemory
 from langchain.callbacks.streaming_stdout import StreamingStdOutCallbackHandler
+from langchain.cache import InMemoryCache
+from langchain.globals import set_llm_cache
+from langchain_core.caches import BaseCache
+import aiohttp
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from bs4 import BeautifulSoup
+import ast
+import functools
+import io
 import json
 import math
+import re
+import time
+
+
+# Shared HTTP session so tool calls reuse keep-alive connections
+_HTTP = requests.Session()
+_adapter = HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=32,
+    max_retries=Retry(total=2, backoff_factor=0.2)
+)
+_HTTP.mount("https://", _adapter)
+_HTTP.mount("http://", _adapter)
+_HTTP.headers.update({
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+})
+
+_WS = re.compile(r"\s+")
+
+# Scraped pages are truncated to 500 characters, so only read the head
+_MAX_PAGE_BYTES = 256 * 1024
+
+# Output AgentExecutor returns when early_stopping_method="force" cuts a run short
+_STOPPED_OUTPUT = "Agent stopped due to iteration limit or time limit."
+
+# Buffer size for file tools, so large files are read and written in few syscalls
+_FILE_BUFFER = 1 << 20
+
+
+class BufferedStdOutCallbackHandler(StreamingStdOutCallbackHandler):
+    """Streams LLM tokens to stdout, batching writes to cut syscalls"""
+    
+    def __init__(self, max_bytes: int = 8192, max_delay: float = 0.025):
+        super().__init__()
+        self.max_bytes = max_bytes
+        self.max_delay = max_delay
+        self._buf: List[str] = []
+        self._size = 0
+        self._last = time.monotonic()
+        # Batched runs stream tokens from several threads
+        self._lock = threading.Lock()
+    
+    def _flush(self) -> None:
+        """Write out any buffered tokens; the caller holds the lock"""
+        if self._buf:
+            sys.stdout.write("".join(self._buf))
+            sys.stdout.flush()
+            self._buf.clear()
+            self._size = 0
+        self._last = time.monotonic()
+    
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        with self._lock:
+            self._buf.append(token)
+            self._size += len(token)
+            if self._size >= self.max_bytes or time.monotonic() - self._last >= self.max_delay:
+                self._flush()
+    
+    def on_llm_end(self, response: Any, **kwargs: Any) -> None:
+        with self._lock:
+            self._flush()
+    
+    def on_llm_error(self, error: BaseException, **kwargs: Any) -> None:
+        with self._lock:
+            self._flush()
+
+
+class ToolError(Exception):
+    """Tool failure whose message is returned to the agent as is"""
+
+
+def ttl_cache(maxsize: int = 128, ttl: float = 60):
+    """
+    LRU cache decorator whose entries expire after ttl seconds.
+    Works for plain and async functions of hashable arguments; calls that
+    raise are not cached. The wrapper exposes cache_clear() to drop all entries.
+    """
+    def decorator(func):
+        cache: "OrderedDict[Any, tuple]" = OrderedDict()
+        lock = threading.Lock()
+        
+        def get(key):
+            with lock:
+                entry = cache.get(key)
+                if entry is not None:
+                    if entry[1] > time.monotonic():
+                        cache.move_to_end(key)
+                        return entry
+                    del cache[key]
+            return None
+        
+        def put(key, value):
+            with lock:
+                cache[key] = (value, time.monotonic() + ttl)
+                cache.move_to_end(key)
+                while len(cache) > maxsize:
+                    cache.popitem(last=False)
+        
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args):
+                entry = get(args)
+                if entry is not None:
+                    return entry[0]
+                value = await func(*args)
+                put(args, value)
+                return value
+        else:
+            @functools.wraps(func)
+            def wrapper(*args):
+                entry = get(args)
+                if entry is not None:
+                    return entry[0]
+                value = func(*args)
+                put(args, value)
+                return value
+        
+        def cache_clear():
+            with lock:
+                cache.clear()
+        
+        wrapper.cache_clear = cache_clear
+        return wrapper
+    
+    return decorator
+
+
+# AST nodes permitted in calculator expressions: numeric literals, arithmetic
+# operators and attributes/calls on the math module
+_CALC_NODES = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.Constant, ast.Call,
+    ast.Attribute, ast.Name, ast.Load, ast.operator, ast.unaryop
+)
+
+
+@functools.lru_cache(maxsize=256)
+def _compile_expression(expression: str):
+    """Validate a calculator expression and compile it to a code object"""
+    tree = ast.parse(expression.strip(), mode="eval")
+    
+    for node in ast.walk(tree):
+        if not isinstance(node, _CALC_NODES):
+            raise ValueError(f"Unsupported syntax: {type(node).__name__}")
+        if isinstance(node, ast.Constant) and not isinstance(node.value, (int, float, complex)):
+            raise ValueError(f"Unsupported constant: {node.value!r}")
+        if isinstance(node, ast.Name) and node.id != "math":
+            raise ValueError(f"Unknown name: {node.id}")
+        if isinstance(node, ast.Attribute) and (
+            not isinstance(node.value, ast.Name) or node.attr.startswith("_")
+        ):
+            raise ValueError(f"Unsupported attribute: {node.attr}")
+        if isinstance(node, ast.Call) and not isinstance(node.func, ast.Attribute):
+            raise ValueError("Only math functions can be called")
+    
+    return compile(tree, "<calc>", "eval")
 
 
 class CustomTools:
@@ -29,12 +199,127 @@ class CustomTools:
         Example: "2 + 2" or "math.sqrt(16)"
         """
         try:
-            # Safe evaluation of mathematical expressions
-            result = eval(expression, {"__builtins__": {}, "math": math}, {})
+            # Only whitelisted arithmetic and math.* calls are compiled
+            code = _compile_expression(expression)
+            result = eval(code, {"__builtins__": {}, "math": math}, {})
             return f"Result: {result}"
         except Exception as e:
             return f"Error in calculation: {str(e)}"
     
+    # Shared aiohttp session for the async tools, created lazily per event loop
+    _aiohttp_session: Optional[aiohttp.ClientSession] = None
+    _aiohttp_loop: Optional[asyncio.AbstractEventLoop] = None
+    
+    @classmethod
+    def _get_aiohttp_session(cls) -> aiohttp.ClientSession:
+        """Return the shared aiohttp session, creating it on first use"""
+        loop = asyncio.get_running_loop()
+        session = cls._aiohttp_session
+        if session is None or session.closed or cls._aiohttp_loop is not loop:
+            cls._discard_aiohttp_session()
+            cls._aiohttp_loop = loop
+            session = cls._aiohttp_session = aiohttp.ClientSession(
+                headers={'User-Agent': _HTTP.headers['User-Agent']},
+                timeout=aiohttp.ClientTimeout(total=10),
+                connector=aiohttp.TCPConnector(limit=32)
+            )
+        return session
+    
+    @classmethod
+    def _discard_aiohttp_session(cls) -> None:
+        """Close a session left over from a previous event loop"""
+        session = cls._aiohttp_session
+        cls._aiohttp_session = None
+        cls._aiohttp_loop = None
+        
+        if session is not None and not session.closed:
+            try:
+                # The old loop is gone; aiohttp closes the connector's sockets
+                # synchronously and returns an awaitable for compatibility
+                asyncio.ensure_future(session.connector.close())
+            except RuntimeError:
+                # Transports of a closed loop cannot schedule their cleanup
+                pass
+    
+    @classmethod
+    async def aclose(cls) -> None:
+        """Close the shared aiohttp session; await before the event loop ends"""
+        session = cls._aiohttp_session
+        cls._aiohttp_session = None
+        cls._aiohttp_loop = None
+        
+        if session is not None and not session.closed:
+            await session.close()
+    
+    @staticmethod
+    def _format_weather(location: str, data: Dict[str, Any]) -> str:
+        """Format a wttr.in JSON response"""
+        current = data['current_condition'][0]
+        
+        weather_info = f"""
+Weather for {location}:
+- Temperature: {current['temp_C']}°C / {current['temp_F']}°F
+- Condition: {current['weatherDesc'][0]['value']}
+- Humidity: {current['humidity']}%
+- Wind Speed: {current['windspeedKmph']} km/h
+        """
+        return weather_info.strip()
+    
+    @staticmethod
+    def _is_text(content_type: str) -> bool:
+        """Check whether a Content-Type header denotes a text document"""
+        return (
+            not content_type
+            or content_type.startswith("text/")
+            or "html" in content_type
+            or "xml" in content_type
+        )
+    
+    @staticmethod
+    def _extract_text(content: bytes) -> str:
+        """Extract readable text from an HTML document"""
+        soup = BeautifulSoup(content, 'lxml')
+        
+        # Remove script and style elements
+        for script in soup(["script", "style"]):
+            script.decompose()
+        
+        # Collect text with collapsed whitespace, stopping once past the limit
+        buf = io.StringIO()
+        for string in soup.stripped_strings:
+            if buf.tell():
+                buf.write(" ")
+            buf.write(_WS.sub(" ", string))
+            if buf.tell() > 500:
+                break
+        text = buf.getvalue()
+        
+        # Limit to first 500 characters
+        return text[:500] + "..." if len(text) > 500 else text
+    
+    @staticmethod
+    @ttl_cache(maxsize=128, ttl=60)
+    def _fetch_weather(location: str) -> str:
+        """Fetch and format weather; raises on failure so errors are not cached"""
+        # Using wttr.in for weather (no API key required)
+        url = f"https://wttr.in/{location}?format=j1"
+        response = _HTTP.get(url, timeout=10)
+        
+        if response.status_code != 200:
+            raise ToolError(f"Could not fetch weather for {location}")
+        return CustomTools._format_weather(location, response.json())
+    
+    @staticmethod
+    @ttl_cache(maxsize=128, ttl=60)
+    async def _fetch_weather_async(location: str) -> str:
+        """Async version of _fetch_weather"""
+        url = f"https://wttr.in/{location}?format=j1"
+        async with CustomTools._get_aiohttp_session().get(url) as response:
+            if response.status != 200:
+                raise ToolError(f"Could not fetch weather for {location}")
+            data = await response.json(content_type=None)
+            return CustomTools._format_weather(location, data)
+    
     @staticmethod
     def weather(location: str) -> str:
         """
@@ -43,28 +328,61 @@ class CustomTools:
         Example: "London" or "New York"
         """
         try:
-            # Using wttr.in for weather (no API key required)
-            url = f"https://wttr.in/{location}?format=j1"
-            response = requests.get(url, timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                current = data['current_condition'][0]
-                
-                weather_info = f"""
-Weather for {location}:
-- Temperature: {current['temp_C']}°C / {current['temp_F']}°F
-- Condition: {current['weatherDesc'][0]['value']}
-- Humidity: {current['humidity']}%
-- Wind Speed: {current['windspeedKmph']} km/h
-                """
-                return weather_info.strip()
-            else:
-                return f"Could not fetch weather for {location}"
-                
+            return CustomTools._fetch_weather(location)
+        except ToolError as e:
+            return str(e)
         except Exception as e:
             return f"Error getting weather: {str(e)}"
     
+    @staticmethod
+    async def weather_async(location: str) -> str:
+        """Async version of weather"""
+        try:
+            return await CustomTools._fetch_weather_async(location)
+        except ToolError as e:
+            return str(e)
+        except Exception as e:
+            return f"Error getting weather: {str(e)}"
+    
+    @staticmethod
+    @ttl_cache(maxsize=128, ttl=60)
+    def _fetch_page_text(url: str) -> str:
+        """Fetch a page and extract its text; raises on failure so errors are not cached"""
+        with _HTTP.get(url, timeout=10, stream=True) as response:
+            content_type = response.headers.get('Content-Type', '')
+            
+            if response.status_code != 200:
+                raise ToolError(f"Failed to fetch URL: Status code {response.status_code}")
+            if not CustomTools._is_text(content_type):
+                raise ToolError(f"Unsupported content type: {content_type}")
+            
+            content = response.raw.read(_MAX_PAGE_BYTES, decode_content=True)
+        
+        return CustomTools._extract_text(content)
+    
+    @staticmethod
+    @ttl_cache(maxsize=128, ttl=60)
+    async def _fetch_page_text_async(url: str) -> str:
+        """Async version of _fetch_page_text"""
+        async with CustomTools._get_aiohttp_session().get(url) as response:
+            content_type = response.headers.get('Content-Type', '')
+            
+            if response.status != 200:
+                raise ToolError(f"Failed to fetch URL: Status code {response.status}")
+            if not CustomTools._is_text(content_type):
+                raise ToolError(f"Unsupported content type: {content_type}")
+            
+            chunks = []
+            size = 0
+            async for chunk in response.content.iter_chunked(64 * 1024):
+                chunks.append(chunk)
+                size += len(chunk)
+                if size >= _MAX_PAGE_BYTES:
+                    break
+            content = b"".join(chunks)[:_MAX_PAGE_BYTES]
+        
+        return CustomTools._extract_text(content)
+    
     @staticmethod
     def web_scraper(url: str) -> str:
         """
@@ -73,30 +391,19 @@ Weather for {location}:
         Example: "https://example.com"
         """
         try:
-            response = requests.get(url, timeout=10, headers={
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            })
-            
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.content, 'html.parser')
-                
-                # Remove script and style elements
-                for script in soup(["script", "style"]):
-                    script.decompose()
-                
-                # Get text
-                text = soup.get_text()
-                
-                # Clean up whitespace
-                lines = (line.strip() for line in text.splitlines())
-                chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-                text = ' '.join(chunk for chunk in chunks if chunk)
-                
-                # Limit to first 500 characters
-                return text[:500] + "..." if len(text) > 500 else text
-            else:
-                return f"Failed to fetch URL: Status code {response.status_code}"
-                
+            return CustomTools._fetch_page_text(url)
+        except ToolError as e:
+            return str(e)
+        except Exception as e:
+            return f"Error scraping web page: {str(e)}"
+    
+    @staticmethod
+    async def web_scraper_async(url: str) -> str:
+        """Async version of web_scraper"""
+        try:
+            return await CustomTools._fetch_page_text_async(url)
+        except ToolError as e:
+            return str(e)
         except Exception as e:
             return f"Error scraping web page: {str(e)}"
     
@@ -110,14 +417,21 @@ Weather for {location}:
         try:
             filename, text = content.split("|", 1)
             
-            with open(filename, 'w') as f:
-                f.write(text)
+            with open(filename, 'wb', buffering=_FILE_BUFFER) as f:
+                f.write(text.encode('utf-8'))
             
             return f"Successfully wrote to {filename}"
             
         except Exception as e:
             return f"Error writing file: {str(e)}"
     
+    @staticmethod
+    @ttl_cache(maxsize=128, ttl=60)
+    def _read_file(filename: str, mtime_ns: int, size: int) -> str:
+        """Read a file; keyed on its mtime and size so any write invalidates it"""
+        with open(filename, 'rb', buffering=_FILE_BUFFER) as f:
+            return f.read().decode('utf-8', 'replace')
+    
     @staticmethod
     def file_reader(filename: str) -> str:
         """
@@ -126,8 +440,8 @@ Weather for {location}:
         Example: "notes.txt"
         """
         try:
-            with open(filename, 'r') as f:
-                content = f.read()
+            stat = os.stat(filename)
+            content = CustomTools._read_file(filename, stat.st_mtime_ns, stat.st_size)
             
             return content if content else "File is empty"
             
@@ -137,41 +451,178 @@ Weather for {location}:
             return f"Error reading file: {str(e)}"
 
 
+class SemanticCache:
+    """Embedding-similarity cache of previous query -> answer pairs"""
+    
+    def __init__(
+        self,
+        model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
+        threshold: float = 0.9,
+        path: Optional[str] = None,
+        ttl: Optional[float] = 3600
+    ):
+        """
+        Initialize the embedding model and FAISS index.
+        If path is given, the index and answers are loaded from and saved to
+        "<path>.index" and "<path>.json".
+        Answers expire after ttl seconds (None keeps them forever), since
+        answers built from Weather or WebSearch results go stale.
+        """
+        import faiss
+        from sentence_transformers import SentenceTransformer
+        
+        self._faiss = faiss
+        self.encoder = SentenceTransformer(model_name)
+        self.threshold = threshold
+        self.path = path
+        self.ttl = ttl
+        self.answers: List[str] = []
+        self.timestamps: List[float] = []
+        
+        if path and os.path.exists(f"{path}.index"):
+            self.index = faiss.read_index(f"{path}.index")
+            with open(f"{path}.json", 'r') as f:
+                data = json.load(f)
+            self.answers = data["answers"]
+            self.timestamps = data["timestamps"]
+        else:
+            # Inner product over normalized vectors is cosine similarity
+            self.index = faiss.IndexFlatIP(self.encoder.get_sentence_embedding_dimension())
+    
+    def _embed(self, text: str):
+        """Encode text as a normalized float32 row vector"""
+        return self.encoder.encode([text], normalize_embeddings=True).astype("float32")
+    
+    def lookup(self, query: str) -> Optional[str]:
+        """Return the cached answer for a similar query, if any"""
+        if self.index.ntotal == 0:
+            return None
+        
+        scores, ids = self.index.search(self._embed(query), 1)
+        if scores[0][0] < self.threshold:
+            return None
+        
+        entry = int(ids[0][0])
+        if self.ttl is not None and time.time() - self.timestamps[entry] > self.ttl:
+            self._remove(entry)
+            return None
+        return self.answers[entry]
+    
+    def _remove(self, entry: int) -> None:
+        """Drop an expired entry; the flat index shifts later ids down like the lists"""
+        import numpy as np
+        
+        self.index.remove_ids(np.array([entry], dtype="int64"))
+        del self.answers[entry]
+        del self.timestamps[entry]
+        
+        if self.path:
+            self.save()
+    
+    def update(self, query: str, answer: str) -> None:
+        """Store an answer for a query"""
+        self.index.add(self._embed(query))
+        self.answers.append(answer)
+        self.timestamps.append(time.time())
+        
+        if self.path:
+            self.save()
+    
+    def save(self) -> None:
+        """Persist the index and answers to disk"""
+        self._faiss.write_index(self.index, f"{self.path}.index")
+        with open(f"{self.path}.json", 'w') as f:
+            json.dump({"answers": self.answers, "timestamps": self.timestamps}, f)
+
+
 class LangChainAgent:
     """LangChain Agent with multiple tools"""
     
-    def __init__(self, model_name: str = "llama2", temperature: float = 0.7):
-        """Initialize the agent with tools"""
+    # Side-effect free tools whose concurrent duplicate calls are coalesced
+    _COALESCED_TOOLS = ("Wikipedia", "WebSearch", "Weather", "WebScraper")
+    
+    def __init__(
+        self,
+        model_name: str = "llama2",
+        temperature: float = 0.7,
+        llm_cache: Optional[BaseCache] = None,
+        semantic_cache: Optional[SemanticCache] = None,
+        memory_window: int = 6,
+        max_iterations: int = 3,
+        max_execution_time: Optional[float] = 15,
+        warmup: bool = True
+    ):
+        """
+        Initialize the agent with tools.
+        llm_cache replaces the default in-memory LLM response cache,
+        e.g. langchain.cache.RedisCache for shared deployments.
+        semantic_cache answers paraphrased repeat queries without running the agent.
+        memory_window is the number of recent exchanges kept in memory.
+        max_iterations and max_execution_time (seconds) bound each agent run.
+        warmup loads the model and opens tool connections before the first query.
+        """
         
         self.model_name = model_name
         self.temperature = temperature
+        self.max_iterations = max_iterations
+        self.max_execution_time = max_execution_time
+        self.semantic_cache = semantic_cache
+        
+        # Cache LLM responses so repeated prompts skip inference
+        set_llm_cache(llm_cache if llm_cache is not None else InMemoryCache())
         
         # Initialize LLM
         self.llm = Ollama(
             model=self.model_name,
             temperature=self.temperature,
-            callbacks=[StreamingStdOutCallbackHandler()]
+            callbacks=[BufferedStdOutCallbackHandler()]
         )
         
-        # Initialize memory
-        self.memory = ConversationBufferMemory(
+        # Initialize memory, keeping only recent exchanges so prompts stay bounded
+        self.memory = ConversationBufferWindowMemory(
+            k=memory_window,
             memory_key="chat_history",
             return_messages=True
         )
         
+        # Lookup tool calls currently running, keyed on (tool name, input)
+        self._inflight: Dict[tuple, Future] = {}
+        self._inflight_lock = threading.Lock()
+        
         # Setup tools
         self.tools = self._create_tools()
         
         # Create agent
         self.agent = self._create_agent()
         
+        # Move cold-start costs off the first query
+        if warmup:
+            self._warmup()
+        
+    def _warmup(self) -> None:
+        """Load the Ollama model and open connections used by tools"""
+        try:
+            # A generate request without a prompt only loads the model
+            _HTTP.post(
+                f"{self.llm.base_url}/api/generate",
+                json={"model": self.model_name},
+                timeout=60
+            )
+        except requests.RequestException:
+            pass
+        
+        try:
+            _HTTP.head("https://wttr.in", timeout=2)
+        except requests.RequestException:
+            pass
+    
     def _create_tools(self) -> List[Tool]:
         """Create and return list of tools"""
         
         # Initialize external tools
-        wikipedia = WikipediaAPIWrapper()
-        search = DuckDuckGoSearchRun()
-        python_repl = PythonREPL()
+        self.wikipedia = WikipediaAPIWrapper()
+        self.search = DuckDuckGoSearchRun()
+        self.python_repl = PythonREPL()
         
         # Create custom tools
         custom_tools = CustomTools()
@@ -180,51 +631,187 @@ class LangChainAgent:
             Tool(
                 name="Calculator",
                 func=custom_tools.calculator,
-                description="Useful for mathematical calculations. Input should be a valid Python expression."
+                description="Evaluates math. Input: Python math expression, e.g. math.sqrt(16)"
             ),
             Tool(
                 name="Wikipedia",
-                func=wikipedia.run,
-                description="Useful for looking up factual information on Wikipedia. Input should be a search query."
+                func=self.wikipedia.run,
+                description="Wikipedia lookup. Input: search query."
             ),
             Tool(
                 name="WebSearch",
-                func=search.run,
-                description="Useful for searching the internet for current information. Input should be a search query."
+                func=self.search.run,
+                description="Web search for current info. Input: query."
             ),
             Tool(
                 name="Weather",
                 func=custom_tools.weather,
-                description="Gets current weather for a location. Input should be a city name."
+                coroutine=custom_tools.weather_async,
+                description="Current weather. Input: city name."
             ),
             Tool(
                 name="WebScraper",
                 func=custom_tools.web_scraper,
-                description="Extracts text from a webpage. Input should be a URL."
+                coroutine=custom_tools.web_scraper_async,
+                description="Webpage text. Input: URL."
             ),
             Tool(
                 name="PythonREPL",
-                func=python_repl.run,
-                description="Executes Python code. Input should be valid Python code. Use for complex computations."
+                func=self.python_repl.run,
+                description="Runs Python code for complex computations. Input: Python code."
             ),
             Tool(
                 name="FileWriter",
                 func=custom_tools.file_writer,
-                description="Writes content to a file. Input format: 'filename.txt|content'"
+                description="Writes a file. Input: 'filename|content'"
             ),
             Tool(
                 name="FileReader",
                 func=custom_tools.file_reader,
-                description="Reads content from a file. Input should be a filename."
+                description="Reads a file. Input: filename."
+            ),
+            Tool(
+                name="Parallel",
+                func=self._parallel,
+                coroutine=self._parallel_async,
+                description="Runs tools concurrently. Input: 'Tool: input || Tool: input'"
             )
         ]
         
+        # Concurrent lookups with the same input share one call
+        for tool in tools:
+            if tool.name in self._COALESCED_TOOLS:
+                tool.func = self._coalesce(tool.name, tool.func)
+                if tool.coroutine is not None:
+                    tool.coroutine = self._coalesce_async(tool.name, tool.coroutine)
+        
+        # Prompt fragments are fixed for the lifetime of the tool list
+        self._tools_desc = "\n".join(f"{tool.name}: {tool.description}" for tool in tools)
+        self._tool_names = ", ".join(tool.name for tool in tools)
+        
         return tools
     
+    def _claim(self, key: tuple) -> tuple:
+        """Return (future, owner) for a tool call, registering it if new"""
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                return future, False
+            future = self._inflight[key] = Future()
+            return future, True
+    
+    def _settle(
+        self,
+        key: tuple,
+        future: Future,
+        result: Any = None,
+        error: Optional[BaseException] = None
+    ) -> None:
+        """Forget a finished tool call and hand its outcome to waiters"""
+        with self._inflight_lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+        
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+    
+    def _coalesce(self, name: str, func):
+        """Wrap a tool function so concurrent duplicate calls share one result"""
+        # Tool passes child callbacks only to functions that accept them
+        accepts_callbacks = "callbacks" in inspect.signature(func).parameters
+        
+        def wrapper(tool_input: str, callbacks: Any = None) -> str:
+            key = (name, tool_input)
+            future, owner = self._claim(key)
+            if not owner:
+                return future.result()
+            
+            kwargs = {"callbacks": callbacks} if accepts_callbacks else {}
+            try:
+                result = func(tool_input, **kwargs)
+            except BaseException as e:
+                self._settle(key, future, error=e)
+                raise
+            self._settle(key, future, result)
+            return result
+        
+        return wrapper
+    
+    def _coalesce_async(self, name: str, coroutine):
+        """Async version of _coalesce"""
+        accepts_callbacks = "callbacks" in inspect.signature(coroutine).parameters
+        
+        async def wrapper(tool_input: str, callbacks: Any = None) -> str:
+            key = (name, tool_input)
+            future, owner = self._claim(key)
+            if not owner:
+                return await asyncio.wrap_future(future)
+            
+            kwargs = {"callbacks": callbacks} if accepts_callbacks else {}
+            try:
+                result = await coroutine(tool_input, **kwargs)
+            except BaseException as e:
+                self._settle(key, future, error=e)
+                raise
+            self._settle(key, future, result)
+            return result
+        
+        return wrapper
+    
+    def _parse_parallel_calls(self, calls: str) -> List[tuple]:
+        """Split Parallel tool input into (tool, input) pairs"""
+        tools = {tool.name: tool for tool in self.tools if tool.name != "Parallel"}
+        parsed = []
+        
+        # Only split on "||" that starts another "ToolName:" call, so inputs
+        # may themselves contain "||"
+        names = "|".join(re.escape(name) for name in tools)
+        separator = re.compile(rf"\|\|(?=\s*(?:{names})\s*:)")
+        
+        for call in separator.split(calls):
+            name, _, tool_input = call.partition(":")
+            tool = tools.get(name.strip())
+            if tool is None or not tool_input.strip():
+                raise ValueError(f"Invalid tool call: '{call.strip()}'")
+            parsed.append((tool, tool_input.strip()))
+        
+        return parsed
+    
+    @staticmethod
+    def _format_parallel_results(calls: List[tuple], results: List[Any]) -> str:
+        """Combine Parallel tool results into one observation"""
+        return "\n\n".join(
+            f"{tool.name}({tool_input}): {result}"
+            for (tool, tool_input), result in zip(calls, results)
+        )
+    
+    def _parallel(self, calls: str) -> str:
+        """Runs several independent tool calls concurrently in threads"""
+        try:
+            parsed = self._parse_parallel_calls(calls)
+            with ThreadPoolExecutor(max_workers=len(parsed)) as pool:
+                results = list(pool.map(lambda call: call[0].run(call[1]), parsed))
+            return self._format_parallel_results(parsed, results)
+        except Exception as e:
+            return f"Error running tools: {str(e)}"
+    
+    async def _parallel_async(self, calls: str) -> str:
+        """Runs several independent tool calls concurrently on the event loop"""
+        try:
+            parsed = self._parse_parallel_calls(calls)
+            results = await asyncio.gather(*(tool.arun(tool_input) for tool, tool_input in parsed))
+            return self._format_parallel_results(parsed, results)
+        except Exception as e:
+            return f"Error running tools: {str(e)}"
+    
     def _create_agent(self) -> AgentExecutor:
         """Create the ReAct agent"""
         
-        # Create prompt template
+        # Create prompt template. Everything before {input} is identical for
+        # every query so Ollama can reuse its KV cache for the prefix; keep
+        # per-query values (timestamps, user ids, history) after it.
         template = """Answer the following questions as best you can. You have access to the following tools:
 
 {tools}
@@ -250,8 +837,8 @@ Thought: {agent_scratchpad}
             template=template,
             input_variables=["input", "agent_scratchpad"],
             partial_variables={
-                "tools": "\n".join([f"{tool.name}: {tool.description}" for tool in self.tools]),
-                "tool_names": ", ".join([tool.name for tool in self.tools])
+                "tools": self._tools_desc,
+                "tool_names": self._tool_names
             }
         )
         
@@ -269,19 +856,121 @@ Thought: {agent_scratchpad}
             memory=self.memory,
             verbose=True,
             handle_parsing_errors=True,
-            max_iterations=5
+            max_iterations=self.max_iterations,
+            max_execution_time=self.max_execution_time,
+            # "generate" is only supported by legacy Agent classes, not the
+            # runnable agent returned by create_react_agent
+            early_stopping_method="force"
         )
         
         return agent_executor
     
+    def _cached_answer(self, query: str) -> Optional[str]:
+        """Return a semantically cached answer for the query, if any"""
+        if self.semantic_cache is None:
+            return None
+        return self.semantic_cache.lookup(query)
+    
+    def _remember(self, query: str, output: str) -> None:
+        """Add a completed answer to the semantic cache"""
+        # Runs cut short by max_iterations/max_execution_time have no real answer
+        if self.semantic_cache is None or output.startswith(_STOPPED_OUTPUT):
+            return
+        self.semantic_cache.update(query, output)
+    
     def run(self, query: str) -> str:
         """Run the agent with a query"""
+        cached = self._cached_answer(query)
+        if cached is not None:
+            return cached
+        
         try:
             result = self.agent.invoke({"input": query})
+            self._remember(query, result["output"])
             return result["output"]
         except Exception as e:
             return f"Error: {str(e)}"
     
+    def stream(self, query: str) -> Iterator[str]:
+        """Run the agent with a query, yielding the answer as it is produced"""
+        cached = self._cached_answer(query)
+        if cached is not None:
+            yield cached
+            return
+        
+        try:
+            output = []
+            for chunk in self.agent.stream({"input": query}):
+                if "output" in chunk:
+                    output.append(chunk["output"])
+                    yield chunk["output"]
+            
+            self._remember(query, "".join(output))
+        except Exception as e:
+            yield f"Error: {str(e)}"
+    
+    async def arun(self, query: str) -> str:
+        """Run the agent with a query asynchronously"""
+        cached = self._cached_answer(query)
+        if cached is not None:
+            return cached
+        
+        try:
+            result = await self.agent.ainvoke({"input": query})
+            self._remember(query, result["output"])
+            return result["output"]
+        except Exception as e:
+            return f"Error: {str(e)}"
+    
+    def _batch_answers(self, queries: List[str]) -> tuple:
+        """Return cached answers (None for misses) and the indices of the misses"""
+        answers = [self._cached_answer(query) for query in queries]
+        misses = [i for i, answer in enumerate(answers) if answer is None]
+        return answers, misses
+    
+    def _fill_batch_answers(
+        self,
+        queries: List[str],
+        answers: List[Optional[str]],
+        misses: List[int],
+        results: List[Any]
+    ) -> List[str]:
+        """Merge agent results for cache misses into the answer list"""
+        for i, result in zip(misses, results):
+            if isinstance(result, Exception):
+                answers[i] = f"Error: {str(result)}"
+            else:
+                answers[i] = result["output"]
+                self._remember(queries[i], result["output"])
+        return answers
+    
+    def batch(self, queries: List[str], max_concurrency: int = 8) -> List[str]:
+        """
+        Run the agent on several queries concurrently.
+        Ollama only serves them in parallel when started with OLLAMA_NUM_PARALLEL > 1.
+        """
+        answers, misses = self._batch_answers(queries)
+        results = self.agent.batch(
+            [{"input": queries[i]} for i in misses],
+            config={"max_concurrency": max_concurrency},
+            return_exceptions=True
+        ) if misses else []
+        return self._fill_batch_answers(queries, answers, misses, results)
+    
+    async def abatch(self, queries: List[str], max_concurrency: int = 8) -> List[str]:
+        """Async version of batch"""
+        answers, misses = self._batch_answers(queries)
+        results = await self.agent.abatch(
+            [{"input": queries[i]} for i in misses],
+            config={"max_concurrency": max_concurrency},
+            return_exceptions=True
+        ) if misses else []
+        return self._fill_batch_answers(queries, answers, misses, results)
+    
+    async def aclose(self) -> None:
+        """Release connections held by the async tools"""
+        await CustomTools.aclose()
+    
     def get_tool_descriptions(self) -> List[Dict[str, str]]:
         """Get descriptions of available tools"""
         return [
@@ -304,6 +993,15 @@ def main():
     for tool in agent.get_tool_descriptions():
         print(f"  - {tool['name']}: {tool['description']}")
     
+    # Queries given on the command line are answered as one batch
+    queries = sys.argv[1:]
+    if queries:
+        print("\n" + "=" * 80)
+        for query, response in zip(queries, agent.batch(queries)):
+            print(f"\nYou: {query}\nAgent: {response}\n")
+            print("-" * 80)
+        return
+    
     print("\n" + "=" * 80)
     print("Agent ready! Type 'quit' to exit.\n")
     
@@ -319,8 +1017,10 @@ def main():
             continue
         
         print("\nAgent: ")
-        response = agent.run(query)
-        print(f"\n{response}\n")
+        for chunk in agent.stream(query):
+            sys.stdout.write(chunk)
+            sys.stdout.flush()
+        print("\n")
         print("-" * 80)
 
 